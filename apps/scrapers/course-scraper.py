@@ -1,10 +1,42 @@
 import os
+import shelve
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+import aiohttp
+import httpx
 from supabase import create_client, Client
-import requests
-from requests import get
-from bs4 import BeautifulSoup
-import pandas as pd
-import numpy as np
+from lxml import html
+from lxml.etree import XPath
+
+def _class_xpath(path, class_name, suffix="", first=False):
+    """
+    Compile an XPath matching elements that carry the given class (alongside any others).
+    With first=True only the first matching element in the document is used, like BeautifulSoup's find().
+    """
+    match = f'{path}[contains(concat(" ", normalize-space(@class), " "), " {class_name} ")]'
+    if first:
+        match = f"({match})[1]"
+    return XPath(f"{match}{suffix}")
+
+# Precompiled XPath selectors for the academic calendar pages
+SITEMAP_LINKS = _class_xpath("//div", "sitemap", "//a", first=True)
+COURSE_BLOCKS = _class_xpath("//div", "courseblock")
+COURSE_CODE = _class_xpath(".//span", "detail-code")
+COURSE_TITLE = _class_xpath(".//span", "detail-title")
+COURSE_UNITS = _class_xpath(".//span", "detail-hours_html")
+COURSE_DESCRIPTION = _class_xpath(".//div", "courseblockextra")
+COURSE_REQUIREMENTS = _class_xpath(".//span", "detail-requirements")
+COURSE_LEARNING_HOURS = _class_xpath(".//span", "detail-learning_hours")
+COURSE_EQUIVALENCIES = _class_xpath(".//span", "detail-course_equivalencies")
+COURSE_FACULTY = _class_xpath(".//span", "detail-offering_faculty")
+COURSE_OUTCOMES = _class_xpath(".//span", "detail-cim_los", "//li")
+
+# On-disk cache of downloaded pages, used to send conditional requests on the next run
+PAGE_CACHE_PATH = os.getenv("COURSE_PAGE_CACHE_PATH", ".course_page_cache")
+
+# Averages used for courses that are not in the database yet
+_NO_AVERAGES = {"average_gpa": None, "average_enrollment": None}
 
 def create_supabase_client():
     """
@@ -15,356 +47,185 @@ def create_supabase_client():
     supabase: Client = create_client(SUPABASE_URL, SUPABASE_KEY)
     return supabase
 
+async def _fetch(url, session, semaphore, cache):
+    """
+    Download a single page and return it alongside its URL.
+    Sends a conditional request when the page is cached, and reuses the cached body if the server answers 304.
+    """
+    cached = cache.get(url)
+    conditional_headers = {}
+    if cached:
+        if cached["etag"]:
+            conditional_headers["If-None-Match"] = cached["etag"]
+        if cached["last_modified"]:
+            conditional_headers["If-Modified-Since"] = cached["last_modified"]
+
+    async with semaphore:
+        async with session.get(url, headers=conditional_headers) as resp:
+            if resp.status == 304:
+                return url, cached["body"]
+            body = await resp.read()
+            etag = resp.headers.get("ETag")
+            last_modified = resp.headers.get("Last-Modified")
+
+    # Only cache pages that can be revalidated on the next run
+    if resp.status == 200 and (etag or last_modified):
+        cache[url] = {"etag": etag, "last_modified": last_modified, "body": body}
+
+    return url, body
+
+async def fetch_all(urls, session, cache, max_concurrency=16):
+    """
+    Download all of the given URLs concurrently over a shared session.
+    Returns a dict mapping each URL to its raw HTML body.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    results = await asyncio.gather(*(_fetch(url, session, semaphore, cache) for url in urls))
+    return dict(results)
 
+def _text(element):
+    """
+    Return the stripped text content of an element (same result as BeautifulSoup's get_text(strip=True)).
+    """
+    return "".join(part.strip() for part in element.itertext())
 
-def scrape_all_course():
+def _first_text(xpath, block, label=""):
+    """
+    Return the text of the first element matched by xpath with its label removed.
+    Returns None if nothing matched or the element holds no value, so missing fields are stored as NULL.
+    """
+    matches = xpath(block)
+    if not matches:
+        return None
+    return _text(matches[0]).removeprefix(label) or None
+
+def _extract_course(course, course_code, include_learning_hours=True):
     """
-    Scrape course data from Queen's University website and store it in Supabase."""
-    headers = { "Accept-Language": "en-US,en;q=0.9,en-GB;q=0.8,en-CA;q=0.7" }
+    Extract the details of a single courseblock into a row dict.
+    """
+    return {
+        "course_code": course_code,
+        "course_name": _text(COURSE_TITLE(course)[0]),
+        "course_description": _first_text(COURSE_DESCRIPTION, course),
+        "offering_faculty": _first_text(COURSE_FACULTY, course, "Offering Faculty: "),
+        "learning_hours": _first_text(COURSE_LEARNING_HOURS, course, "Learning Hours: ") if include_learning_hours else None,
+        "course_learning_outcomes": [_text(li) for li in COURSE_OUTCOMES(course)],
+        "course_requirements": _first_text(COURSE_REQUIREMENTS, course, "Requirements: "),
+        "course_equivalencies": _first_text(COURSE_EQUIVALENCIES, course, "Course Equivalencies: "),
+        "course_units": _text(COURSE_UNITS(course)[0]).removeprefix("Units: "),
+    }
+
+def _extract_courses(page, seen_codes, include_learning_hours=True):
+    """
+    Extract every courseblock on a parsed page.
+    Cross-listed courses appear on several pages, so blocks whose code is already in seen_codes are skipped before the remaining fields are parsed.
+    """
+    for course in COURSE_BLOCKS(page):
+        course_code = _text(COURSE_CODE(course)[0])
+        if course_code in seen_codes:
+            continue
+        seen_codes.add(course_code)
+        yield _extract_course(course, course_code, include_learning_hours)
+
+def parse_page(body, include_learning_hours=True):
+    """
+    Parse a downloaded calendar page and return its courses as a list of row dicts.
+    Runs in a worker process, so it only deduplicates courses within the page.
+    """
+    return list(_extract_courses(html.fromstring(body), set(), include_learning_hours))
+
+async def fetch_course_pages():
+    """
+    Download the course description pages of every faculty.
+    Returns a list of (faculty, page bodies, whether the faculty publishes learning hours) tuples.
+    """
+    headers = {
+        "Accept-Language": "en-US,en;q=0.9,en-GB;q=0.8,en-CA;q=0.7",
+        "Accept-Encoding": "gzip, br",  # aiohttp decompresses transparently (br requires the Brotli package)
+        "User-Agent": "CoursifyBot/1.0",
+    }
     art_sci_url = "https://www.queensu.ca/academic-calendar/arts-science/course-descriptions/"
     education_url = "https://www.queensu.ca/academic-calendar/education/course-descriptions/"
     health_sci_url = "https://www.queensu.ca/academic-calendar/health-sciences/bhsc/courses-instruction/"
     nursing_url = "https://www.queensu.ca/academic-calendar/nursing/bachelor-nursing-science-course-descriptions/"
-    engineering_urls = [
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/apsc/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/chee/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/civl/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/cmpe/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/elec/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/ench/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/enph/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/geoe/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/mthe/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/mech/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/mren/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/mine/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/mntc/",
-        "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/soft/",
-    ]
+    engineering_url = "https://www.queensu.ca/academic-calendar/engineering-applied-sciences/courses-instruction/"
 
     commerce_url = "https://www.queensu.ca/academic-calendar/business/bachelor-commerce/courses-of-instruction/by20number/#onezerozeroleveltext"
-    
-    # Create a pandas DataFrame to store the scraped data
-    columns = [
-        "course_code",
-        "course_name",
-        "course_description",
-        "offering_faculty",
-        "learning_hours",
-        "course_learning_outcomes",
-        "course_requirements",
-        "course_equivalencies"
-    ]
-    course_data = pd.DataFrame(columns=columns)
-    
-    # Faculty 1: Arts & Science
-    print("Scraping Arts & Science courses...")
-    
-    # Step 1: Get the main URL content
-    results = requests.get(art_sci_url, headers=headers)
-    art_sci_main_url_content = BeautifulSoup(results.content, "html.parser")
-
-    # Step 2: Find the embedded links for the course offerings page for each department within the faculty
-    art_sci_main_url_content_container = art_sci_main_url_content.find("div", class_="sitemap") # get the container element
-    art_sci_dept_course_pages = art_sci_main_url_content_container.find_all("a") # get all the links in the container
-
-    # Step 3: For each department, go through the courses offered and scrape the data
-    for dept_course_page in art_sci_dept_course_pages:
-                
-        # Get the URL and name of the department course page
-        dept_course_page_url = dept_course_page.get("href")
-        dept_course_page_name = dept_course_page.get_text(strip=True)
-        print(f"Scraping {dept_course_page_name} courses...")
-        
-        # Make a request to the department course page
-        dept_course_page_results = requests.get("https://www.queensu.ca" + dept_course_page_url, headers=headers)
-        dept_course_page_content = BeautifulSoup(dept_course_page_results.content, "html.parser")
-        
-        # Get each course from the department course page
-        courses = dept_course_page_content.find_all("div", class_="courseblock")
-        for course in courses:
-            course_code = course.find("span", class_="detail-code").get_text(strip=True)
-            course_name = course.find("span", class_="detail-title").get_text(strip=True)
-            course_units = course.find("span", class_="detail-hours_html").get_text(strip=True).replace("Units: ", "")
-            course_description = course.find("div", class_="courseblockextra").get_text(strip=True) if course.find("div", class_="courseblockextra") else None
-            course_requirements = course.find("span", class_="detail-requirements").get_text(strip=True).replace("Requirements: ", "") if course.find("span", class_="detail-requirements") else None
-            course_learning_hours = course.find("span", class_="detail-learning_hours").get_text(strip=True).replace("Learning Hours: ", "") if course.find("span", class_="detail-learning_hours") else None
-            course_equivalencies = course.find("span", class_="detail-course_equivalencies").get_text(strip=True).replace("Course Equivalencies: ", "") if course.find("span", class_="detail-course_equivalencies") else None
-            offering_faculty = course.find("span", class_="detail-offering_faculty").get_text(strip=True).replace("Offering Faculty: ", "") if course.find("span", class_="detail-offering_faculty") else None
-
-            learning_outcomes = []
-            outcomes_section = course.find("span", class_="detail-cim_los")
-            if outcomes_section:
-                outcomes_list = outcomes_section.find_all("li")
-                for outcome in outcomes_list:
-                    learning_outcomes.append(outcome.get_text(strip=True))
-
-            # Append the course data to the DataFrame
-            course_data = pd.concat([
-            course_data,
-            pd.DataFrame([{
-                "course_code": course_code,
-                "course_name": course_name,
-                "course_description": course_description,
-                "offering_faculty": offering_faculty,
-                "learning_hours": course_learning_hours,
-                "course_learning_outcomes": learning_outcomes,
-                "course_requirements": course_requirements,
-                "course_equivalencies": course_equivalencies,
-                "course_units": course_units
-            }])
-            ], ignore_index=True)
-
-    # Print success message
-    print("✔ Successfully scraped Arts & Science courses!")
-
-    # Step 4: Repeat the process for other faculties
-    
-    # Faculty 2: Education
-    print("Scraping Education courses...")
-
-    # Step 1: Get the main URL content
-    results = requests.get(education_url, headers=headers)
-    education_main_url_content = BeautifulSoup(results.content, "html.parser")
-
-    # Step 2: Find all course blocks
-    course_blocks = education_main_url_content.find_all("div", class_="courseblock")
-
-    # Step 3: Extract course details
-    for course in course_blocks:
-        course_code = course.find("span", class_="detail-code").get_text(strip=True)
-        course_name = course.find("span", class_="detail-title").get_text(strip=True)
-        course_units = course.find("span", class_="detail-hours_html").get_text(strip=True).replace("Units: ", "")
-        course_description = course.find("div", class_="courseblockextra").get_text(strip=True) if course.find("div", class_="courseblockextra") else None
-        course_requirements = course.find("span", class_="detail-requirements").get_text(strip=True).replace("Requirements: ", "") if course.find("span", class_="detail-requirements") else None
-        course_learning_hours = course.find("span", class_="detail-learning_hours").get_text(strip=True).replace("Learning Hours: ", "") if course.find("span", class_="detail-learning_hours") else None
-        course_equivalencies = course.find("span", class_="detail-course_equivalencies").get_text(strip=True).replace("Course Equivalencies: ", "") if course.find("span", class_="detail-course_equivalencies") else None
-        offering_faculty = course.find("span", class_="detail-offering_faculty").get_text(strip=True).replace("Offering Faculty: ", "") if course.find("span", class_="detail-offering_faculty") else None
-
-        learning_outcomes = []
-        outcomes_section = course.find("span", class_="detail-cim_los")
-        if outcomes_section:
-            outcomes_list = outcomes_section.find_all("li")
-            for outcome in outcomes_list:
-                learning_outcomes.append(outcome.get_text(strip=True))
-
-        # Append the course data to the DataFrame
-        course_data = pd.concat([
-            course_data,
-            pd.DataFrame([{
-                "course_code": course_code,
-                "course_name": course_name,
-                "course_description": course_description,
-                "offering_faculty": offering_faculty,
-                "learning_hours": course_learning_hours,
-                "course_learning_outcomes": learning_outcomes,
-                "course_requirements": course_requirements,
-                "course_equivalencies": course_equivalencies,
-                "course_units": course_units
-            }])
-        ], ignore_index=True)
-
-    # Print success message
-    print("✔ Successfully scraped Education courses!")
-
-    # Faculty 3: Health Sciences
-    print("Scraping Health Sciences courses...")
-    results = requests.get(health_sci_url, headers=headers)
-    health_sci_main_url_content = BeautifulSoup(results.content, "html.parser")
-
-    # Step 1: Find all course blocks
-    course_blocks = health_sci_main_url_content.find_all("div", class_="courseblock")
-
-    # Step 2: Extract course details
-    for course in course_blocks:
-        course_code = course.find("span", class_="detail-code").get_text(strip=True)
-        course_name = course.find("span", class_="detail-title").get_text(strip=True)
-        course_units = course.find("span", class_="detail-hours_html").get_text(strip=True).replace("Units: ", "")
-        course_description = course.find("div", class_="courseblockextra").get_text(strip=True) if course.find("div", class_="courseblockextra") else None
-        course_requirements = course.find("span", class_="detail-requirements").get_text(strip=True).replace("Requirements: ", "") if course.find("span", class_="detail-requirements") else None
-        course_learning_hours = course.find("span", class_="detail-learning_hours").get_text(strip=True).replace("Learning Hours: ", "") if course.find("span", class_="detail-learning_hours") else None
-        course_equivalencies = course.find("span", class_="detail-course_equivalencies").get_text(strip=True).replace("Course Equivalencies: ", "") if course.find("span", class_="detail-course_equivalencies") else None
-        offering_faculty = course.find("span", class_="detail-offering_faculty").get_text(strip=True).replace("Offering Faculty: ", "") if course.find("span", class_="detail-offering_faculty") else None
-
-        learning_outcomes = []
-        outcomes_section = course.find("span", class_="detail-cim_los")
-        if outcomes_section:
-            outcomes_list = outcomes_section.find_all("li")
-            for outcome in outcomes_list:
-                learning_outcomes.append(outcome.get_text(strip=True))
-
-        # Append the course data to the DataFrame
-        course_data = pd.concat([
-            course_data,
-            pd.DataFrame([{
-                "course_code": course_code,
-                "course_name": course_name,
-                "course_description": course_description,
-                "offering_faculty": offering_faculty,
-                "learning_hours": course_learning_hours,
-                "course_learning_outcomes": learning_outcomes,
-                "course_requirements": course_requirements,
-                "course_equivalencies": course_equivalencies,
-                "course_units": course_units
-            }])
-        ], ignore_index=True)
-
-    # Print success message
-    print("✔ Successfully scraped Health Sciences courses!")
-
-    # Faculty 4: Nursing
-    print("Scraping Nursing courses...")
-    results = requests.get(nursing_url, headers=headers)
-    nursing_main_url_content = BeautifulSoup(results.content, "html.parser")
-
-    # Step 1: Find all course blocks
-    course_blocks = nursing_main_url_content.find_all("div", class_="courseblock")
-
-    # Step 2: Extract course details
-    for course in course_blocks:
-        course_code = course.find("span", class_="detail-code").get_text(strip=True)
-        course_name = course.find("span", class_="detail-title").get_text(strip=True)
-        course_units = course.find("span", class_="detail-hours_html").get_text(strip=True).replace("Units: ", "")
-        course_description = course.find("div", class_="courseblockextra").get_text(strip=True) if course.find("div", class_="courseblockextra") else None
-        course_requirements = course.find("span", class_="detail-requirements").get_text(strip=True).replace("Requirements: ", "") if course.find("span", class_="detail-requirements") else None
-        course_learning_hours = None  # Not available in the provided structure
-        course_equivalencies = course.find("span", class_="detail-course_equivalencies").get_text(strip=True).replace("Course Equivalencies: ", "") if course.find("span", class_="detail-course_equivalencies") else None
-        offering_faculty = course.find("span", class_="detail-offering_faculty").get_text(strip=True).replace("Offering Faculty: ", "") if course.find("span", class_="detail-offering_faculty") else None
-
-        learning_outcomes = []
-        outcomes_section = course.find("span", class_="detail-cim_los")
-        if outcomes_section:
-            outcomes_list = outcomes_section.find_all("li")
-            for outcome in outcomes_list:
-                learning_outcomes.append(outcome.get_text(strip=True))
-
-        # Append the course data to the DataFrame
-        course_data = pd.concat([
-            course_data,
-            pd.DataFrame([{
-                "course_code": course_code,
-                "course_name": course_name,
-                "course_description": course_description,
-                "offering_faculty": offering_faculty,
-                "learning_hours": course_learning_hours,
-                "course_learning_outcomes": learning_outcomes,
-                "course_requirements": course_requirements,
-                "course_equivalencies": course_equivalencies,
-                "course_units": course_units
-            }])
-        ], ignore_index=True)
 
-    # Print success message
-    print("✔ Successfully scraped Nursing courses!")
-
-    # Faculty 5: Engineering
-    print("Scraping Engineering courses...")
-
-    for engineering_url in engineering_urls:
-        # Make a request to the engineering URL
-        results = requests.get(engineering_url, headers=headers)
-        engineering_main_url_content = BeautifulSoup(results.content, "html.parser")
-
-        # Find all course blocks
-        course_blocks = engineering_main_url_content.find_all("div", class_="courseblock")
-
-        # Extract course details
-        for course in course_blocks:
-            course_code = course.find("span", class_="detail-code").get_text(strip=True)
-            course_name = course.find("span", class_="detail-title").get_text(strip=True)
-            course_units = course.find("span", class_="detail-hours_html").get_text(strip=True).replace("Units: ", "")
-            course_description = course.find("div", class_="courseblockextra").get_text(strip=True) if course.find("div", class_="courseblockextra") else None
-            course_requirements = course.find("span", class_="detail-requirements").get_text(strip=True).replace("Requirements: ", "") if course.find("span", class_="detail-requirements") else None
-            course_learning_hours = None  # Not available in the provided structure
-            course_equivalencies = course.find("span", class_="detail-course_equivalencies").get_text(strip=True).replace("Course Equivalencies: ", "") if course.find("span", class_="detail-course_equivalencies") else None
-            offering_faculty = course.find("span", class_="detail-offering_faculty").get_text(strip=True).replace("Offering Faculty: ", "") if course.find("span", class_="detail-offering_faculty") else None
-
-            learning_outcomes = []
-            outcomes_section = course.find("span", class_="detail-cim_los")
-            if outcomes_section:
-                outcomes_list = outcomes_section.find_all("li")
-                for outcome in outcomes_list:
-                    learning_outcomes.append(outcome.get_text(strip=True))
-
-            # Append the course data to the DataFrame
-            course_data = pd.concat([
-                course_data,
-                pd.DataFrame([{
-                    "course_code": course_code,
-                    "course_name": course_name,
-                    "course_description": course_description,
-                    "offering_faculty": offering_faculty,
-                    "learning_hours": course_learning_hours,
-                    "course_learning_outcomes": learning_outcomes,
-                    "course_requirements": course_requirements,
-                    "course_equivalencies": course_equivalencies,
-                    "course_units": course_units
-                }])
-            ], ignore_index=True)
-
-        print(f"✔ Successfully scraped courses from {engineering_url}")
-
-    # Faculty 6: Commerce
-    print("Scraping Commerce courses...")
-
-    # Make a request to the Commerce URL
-    response = requests.get(commerce_url, headers=headers)
-    soup = BeautifulSoup(response.content, "html.parser")
-
-    # Find all course blocks
-    course_blocks = soup.find_all("div", class_="courseblock")
-
-    # Extract course details
-    for course in course_blocks:
-        course_code = course.find("span", class_="detail-code").get_text(strip=True)
-        course_name = course.find("span", class_="detail-title").get_text(strip=True)
-        course_units = course.find("span", class_="detail-hours_html").get_text(strip=True).replace("Units: ", "")
-        course_description = course.find("div", class_="courseblockextra").get_text(strip=True) if course.find("div", class_="courseblockextra") else None
-        course_requirements = course.find("span", class_="detail-requirements").get_text(strip=True).replace("Requirements: ", "") if course.find("span", class_="detail-requirements") else None
-        course_equivalencies = course.find("span", class_="detail-course_equivalencies").get_text(strip=True).replace("Course Equivalencies: ", "") if course.find("span", class_="detail-course_equivalencies") else None
-        offering_faculty = course.find("span", class_="detail-offering_faculty").get_text(strip=True).replace("Offering Faculty: ", "") if course.find("span", class_="detail-offering_faculty") else None
-
-        learning_outcomes = []
-        outcomes_section = course.find("span", class_="detail-cim_los")
-        if outcomes_section:
-            outcomes_list = outcomes_section.find_all("li")
-            for outcome in outcomes_list:
-                learning_outcomes.append(outcome.get_text(strip=True))
-
-        # Append the course data to the DataFrame
-        course_data = pd.concat([
-            course_data,
-            pd.DataFrame([{
-                "course_code": course_code,
-                "course_name": course_name,
-                "course_description": course_description,
-                "offering_faculty": offering_faculty,
-                "learning_hours": None,  # Not available in this structure
-                "course_learning_outcomes": learning_outcomes,
-                "course_requirements": course_requirements,
-                "course_equivalencies": course_equivalencies,
-                "course_units": course_units
-            }])
-        ], ignore_index=True)
-
-    # Print success message
-    print("✔ Successfully scraped Commerce courses!")
-
-    # Drop duplicates
-    course_data.drop_duplicates(subset=["course_code"], inplace=True)
+    # Download every page through one pooled session so connections to queensu.ca are reused across both waves
+    with shelve.open(PAGE_CACHE_PATH) as cache:
+        async with aiohttp.ClientSession(headers=headers, connector=aiohttp.TCPConnector(limit=32)) as session:
+            pages = await fetch_all(
+                [art_sci_url, engineering_url, education_url, health_sci_url, nursing_url, commerce_url],
+                session,
+                cache,
+            )
+
+            # The Arts & Science and Engineering department pages are linked from each faculty's sitemap,
+            # so they are discovered from the first wave and fetched together in a second wave
+            art_sci_dept_urls = ["https://www.queensu.ca" + link.get("href") for link in SITEMAP_LINKS(html.fromstring(pages[art_sci_url]))]
+            engineering_dept_urls = ["https://www.queensu.ca" + link.get("href") for link in SITEMAP_LINKS(html.fromstring(pages[engineering_url]))]
+            dept_pages = await fetch_all(art_sci_dept_urls + engineering_dept_urls, session, cache)
+
+    # Pages of each faculty, and whether the faculty publishes learning hours
+    faculty_pages = [
+        ("Arts & Science", [dept_pages[url] for url in art_sci_dept_urls], True),
+        ("Education", [pages[education_url]], True),
+        ("Health Sciences", [pages[health_sci_url]], True),
+        ("Nursing", [pages[nursing_url]], False),
+        ("Engineering", [dept_pages[url] for url in engineering_dept_urls], False),
+        ("Commerce", [pages[commerce_url]], False),
+    ]
 
-    # Clean the dataframe
-    course_data.replace({np.nan: None, float("inf"): None, float("-inf"): None}, inplace=True)
-    
-    # Print hte number of rows in the DataFrame
-    print(f"Total number of courses scraped: {len(course_data)}")
+    return faculty_pages
 
-    return course_data
+def scrape_all_course():
+    """
+    Scrape course data from Queen's University website.
+    The pages are downloaded in an event loop, which has finished before the process pool that parses them is started.
+    """
+    faculty_pages = asyncio.run(fetch_course_pages())
+
+    # Collect the scraped courses as a list of row dicts, keeping only the first occurrence of each course code
+    rows = []
+    seen_codes = set()
+
+    # Parse all of the pages across a process pool; every page is submitted up front
+    # and the results are read back in faculty order so the first occurrence of a cross-listed course wins
+    with ProcessPoolExecutor() as pool:
+        parsed_faculties = [
+            (faculty, pool.map(parse_page, bodies, repeat(include_learning_hours)))
+            for faculty, bodies, include_learning_hours in faculty_pages
+        ]
+
+        for faculty, parsed_pages in parsed_faculties:
+            print(f"Scraping {faculty} courses...")
+            for page_rows in parsed_pages:
+                for row in page_rows:
+                    if row["course_code"] not in seen_codes:
+                        seen_codes.add(row["course_code"])
+                        rows.append(row)
+            print(f"✔ Successfully scraped {faculty} courses!")
+
+    # Print the number of courses scraped
+    print(f"Total number of courses scraped: {len(rows)}")
+
+    return rows
+
+async def _upsert_batch(client, batch, semaphore):
+    """
+    Upsert a single batch of courses through the PostgREST endpoint.
+    """
+    async with semaphore:
+        response = await client.post("/rest/v1/courses", params={"on_conflict": "course_code"}, json=batch)
+        response.raise_for_status()
+        print(f"✅ Upserted {len(batch)} courses")
 
-def upsert_course_data_to_supabase(supabase, course_data, batch_size=50):
+async def upsert_course_data_to_supabase(supabase, course_data, batch_size=1000, max_concurrency=8):
     """
     Upsert course data into Supabase, updating if already exists.
     Preserve average_gpa and average_enrollment if course already exists.
+    Batches are sent concurrently straight to PostgREST using the client's URL and key.
     """
 
     existing_courses_response = supabase.table("courses").select("course_code, average_gpa, average_enrollment").execute()
@@ -379,35 +240,23 @@ def upsert_course_data_to_supabase(supabase, course_data, batch_size=50):
 
     upsert_payload = []
 
-    for index, row in course_data.iterrows():
-        course_code = row["course_code"]
-
-        if course_code in existing_courses:
-            avg_gpa = existing_courses[course_code]["average_gpa"]
-            avg_enroll = existing_courses[course_code]["average_enrollment"]
-        else:
-            avg_gpa = None
-            avg_enroll = None
-
-        upsert_payload.append({
-            "course_code": course_code,
-            "course_name": row["course_name"],
-            "course_description": row["course_description"],
-            "offering_faculty": row["offering_faculty"],
-            "learning_hours": row["learning_hours"],
-            "course_learning_outcomes": row["course_learning_outcomes"],
-            "course_requirements": row["course_requirements"],
-            "course_equivalencies": row["course_equivalencies"],
-            "course_units": row["course_units"],
-            "average_gpa": avg_gpa,
-            "average_enrollment": avg_enroll,
-        })
-
-        # If batch size reached or last row, send to Supabase
-        if len(upsert_payload) == batch_size or index == len(course_data) - 1:
-            supabase.table("courses").upsert(upsert_payload, on_conflict=["course_code"]).execute()
-            print(f"✅ Upserted {len(upsert_payload)} courses")
-            upsert_payload.clear()
+    for row in course_data:
+        # Carry over the averages of existing courses, new courses have none yet
+        previous = existing_courses.get(row["course_code"], _NO_AVERAGES)
+        row["average_gpa"] = previous["average_gpa"]
+        row["average_enrollment"] = previous["average_enrollment"]
+        upsert_payload.append(row)
+
+    # Split the payload into batches and send them to Supabase concurrently
+    batches = [upsert_payload[i:i + batch_size] for i in range(0, len(upsert_payload), batch_size)]
+    headers = {
+        "apikey": supabase.supabase_key,
+        "Authorization": f"Bearer {supabase.supabase_key}",
+        "Prefer": "resolution=merge-duplicates,return=minimal",
+    }
+    semaphore = asyncio.Semaphore(max_concurrency)
+    async with httpx.AsyncClient(base_url=supabase.supabase_url, headers=headers) as client:
+        await asyncio.gather(*(_upsert_batch(client, batch, semaphore) for batch in batches))
 
     print("✔ Successfully batch upserted all course data into Supabase!")
 
@@ -420,7 +269,7 @@ if __name__ == "__main__":
     course_data = scrape_all_course()
     
     # Check for new courses and add them to Supabase
-    upsert_course_data_to_supabase(supabase, course_data)
+    asyncio.run(upsert_course_data_to_supabase(supabase, course_data))
 
     # Print success message
     print("✔ Periodic course data check and update completed successfully!")
\ No newline at end of file
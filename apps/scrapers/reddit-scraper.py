@@ -1,14 +1,57 @@
 import praw
 import os
 import re
+import json
+import time
 import uuid
-from datetime import datetime
+import asyncio
+import httpx
+import orjson
 from supabase import create_client, Client
-from textblob import TextBlob
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
+import ahocorasick
 
 # Precompiled regex patterns
 PROF_NAME_REGEX = re.compile(r'\b(?:Prof\.?|Dr\.?)\s+[A-Z][a-z]+\s+[A-Z][a-z]+\b')
 COURSE_CODE_REGEX = re.compile(r'\b[A-Za-z]{4}\s?\d{3}\b')
+# Both of the above in one pass; a course code that starts at a professor's last name ("Dr. Jane Cisc 121")
+# would be consumed by the prof match, so it is captured by a lookahead as code_in_prof
+PROF_OR_COURSE_CODE_REGEX = re.compile(
+    r'(?P<prof>\b(?:Prof\.?|Dr\.?)\s+[A-Z][a-z]+\s+(?=(?P<code_in_prof>[A-Za-z]{4}\s?\d{3}\b))?[A-Z][a-z]+\b)'
+    r'|(?P<code>\b[A-Za-z]{4}\s?\d{3}\b)'
+)
+# Course code or general course-related keywords ("course" also covers "courses" and "bird courses"), matched on lowercased text
+INTEREST_REGEX = re.compile(r"\b[a-z]{4}\s?\d{3}\b|course|classes|electives|program requirements|easy a\b")
+NEGATION_REGEX = re.compile(r"not\s+(?:(?P<easy>easy|light|bird course|straightforward)|(?P<hard>hard|tough|difficult|challenging|brutal|intense))")
+
+# VADER sentiment analyzer (its lexicon is installed with `python -m nltk.downloader vader_lexicon`)
+SENTIMENT_ANALYZER = SentimentIntensityAnalyzer()
+
+# Maximum number of comments sent to Supabase in a single insert
+INSERT_BATCH_SIZE = 500
+
+# Number of candidate post URLs checked against Supabase per request; each quoted, percent-encoded permalink
+# takes ~140 characters of the query string, so 20 of them stay well under the common 8 KB request-line limit
+PROCESSED_URL_CHUNK_SIZE = 20
+
+# Local cache of post URLs already stored in rag_chunks, so they are not looked up in Supabase again on the next run
+PROCESSED_URL_CACHE_PATH = os.getenv("PROCESSED_URL_CACHE_PATH", ".processed_url_cache.json")
+
+# Keywords for each tag, in the order the tags are reported
+TAG_KEYWORDS = {
+    "easy": ["easy", "light", "bird course", "manageable", "straightforward"],
+    "hard": ["hard", "tough", "difficult", "challenging", "brutal", "intense"],
+    "professor_review": ["professor", "lecturer", "teaching", "instructor", "teaches", "taught"],
+    "course_structure": ["exam", "midterm", "final", "assignment", "homework", "reading", "workload", "labs", "quizzes", "group project"],
+    "tips": ["recommend", "tip", "advice", "suggest", "strategy", "resource", "how to study"],
+}
+
+# Single Aho-Corasick automaton over every tag keyword, so one pass over a comment finds all of its tags
+TAG_AUTOMATON = ahocorasick.Automaton()
+for tag, keywords in TAG_KEYWORDS.items():
+    for keyword in keywords:
+        TAG_AUTOMATON.add_word(keyword, tag)
+TAG_AUTOMATON.make_automaton()
 
 def create_supabase_client():
     """
@@ -34,11 +77,10 @@ def setup_reddit():
 
 def detect_sentiment(text):
     """
-    Determine the sentiment of a given text using TextBlob.
+    Determine the sentiment of a given text using the VADER lexicon.
     returns a sentiment_score (float between -1 and 1) and a sentiment_label (very positive, positive, neutral, negative, very negative).
     """
-    blob = TextBlob(text)
-    sentiment_score = blob.sentiment.polarity
+    sentiment_score = SENTIMENT_ANALYZER.polarity_scores(text)["compound"]
     if sentiment_score > 0.5:
         sentiment_label = "very positive"
     elif sentiment_score > 0.2:
@@ -52,116 +94,92 @@ def detect_sentiment(text):
 
     return sentiment_score, sentiment_label
 
-def detect_tags(text):
+def detect_tags(text, already_lower=False):
     """
     Creates tags based on the text content.
     Returns a list of tags.
     Possible tag values: easy, hard, professor_review, course_structure (i.e final exams, assignments, workload), tips
+    Pass already_lower=True when the caller has lowercased the text, to avoid lowercasing it again.
     """
-    body = text.lower()
-    tags = []
+    body = text if already_lower else text.lower()
 
-    # Preprocessing: detect negations manually
-    is_not_easy = bool(re.search(r"not\s+(easy|light|bird course|straightforward)", body))
-    is_not_hard = bool(re.search(r"not\s+(hard|tough|difficult|challenging|brutal|intense)", body))
+    # Find every tag whose keywords appear in the comment
+    found_tags = {tag for _, tag in TAG_AUTOMATON.iter(body)}
 
-    # Difficulty (easy)
-    if not is_not_easy and any(word in body for word in ["easy", "light", "bird course", "manageable", "straightforward"]):
-        tags.append("easy")
+    # Preprocessing: detect negations manually, the group name of each match tells which tag is negated
+    if "easy" in found_tags or "hard" in found_tags:
+        found_tags -= {match.lastgroup for match in NEGATION_REGEX.finditer(body)}
 
-    # Difficulty (hard)
-    if not is_not_hard and any(word in body for word in ["hard", "tough", "difficult", "challenging", "brutal", "intense"]):
-        tags.append("hard")
-
-    # Professor reviews
-    if any(word in body for word in ["professor", "lecturer", "teaching", "instructor", "teaches", "taught"]):
-        tags.append("professor_review")
-
-    # Course structure (exams, assignments, workload)
-    if any(word in body for word in ["exam", "midterm", "final", "assignment", "homework", "reading", "workload", "labs", "quizzes", "group project"]):
-        tags.append("course_structure")
-
-    # Tips and advice
-    if any(word in body for word in ["recommend", "tip", "advice", "suggest", "strategy", "resource", "how to study"]):
-        tags.append("tips")
+    tags = [tag for tag in TAG_KEYWORDS if tag in found_tags]
 
     return tags
 
-def extract_prof_name_from_post(post):
+def extract_prof_name(text):
     """
-    Extract the first detected professor name from a Reddit post's title or selftext.
+    Extract the first detected professor name from a post's title and selftext or a comment's body.
     Matches formats like 'Dr. John Doe', 'Prof. Jane Smith', case-insensitive.
     
     Returns:
         prof_name (str) if found, otherwise None
     """
-    # Combine title and selftext for full scanning
-    full_text = f"{post.title} {post.selftext}"
-
     # Search for professor names
-    match = PROF_NAME_REGEX.search(full_text)
-    
-    if match:
-        return match.group(0)
-    else:
-        return None
-    
-def extract_prof_name_from_comment(comment):
-    """
-    Extract the first detected professor name from a Reddit comment's body.
-    Matches formats like 'Dr. John Doe', 'Prof. Jane Smith', case-insensitive.
-    
-    Returns:
-        prof_name (str) if found, otherwise None
-    """
-    # Search for professor names
-    match = PROF_NAME_REGEX.search(comment.body)
+    match = PROF_NAME_REGEX.search(text)
     
     if match:
         return match.group(0)
     else:
         return None
 
-def is_comment_of_interest(comment):
-    body = comment.body.strip()
-
-    # Must not be empty
-    if not body:
-        return False
-
-    # Must not be deleted or removed
-    if body.lower() in ["[deleted]", "[removed]"]:
-        return False
-
+def is_comment_of_interest(body, score):
     # Optional: Must have some engagement
-    if comment.score < 1:
+    if score < 1:
         return False
 
     # Optional: Must have decent length (avoid "lol" type comments)
-    if len(body) < 15:
+    # The raw length is checked first so short comments are rejected without stripping them
+    if len(body) < 15 or len(body.strip()) < 15:
         return False
 
+    # Empty, "[deleted]" and "[removed]" comments are all shorter than 15 characters, so they are already rejected above
+
     # ✅ Passed all checks
     return True
 
-def extract_course_code_from_post(post):
-    full_text = f"{post.title} {post.selftext}"
-    match = COURSE_CODE_REGEX.search(full_text)
-    
-    if match:
-        course_code = match.group(0).replace(" ", "").upper()
-        # Insert a space between letters and digits
-        course_code = re.sub(r"([A-Z]{4})(\d{3})", r"\1 \2", course_code)
-        return course_code
-    else:
-        return None
+def extract_prof_and_course_code(text):
+    """
+    Extract the first detected professor name and course code from a post's title and selftext in a single regex pass.
+
+    Returns:
+        (prof_name, course_code) with each set to None if not found, the course code formatted like 'CISC 121'
+    """
+    prof_name = None
+    course_code = None
+
+    for match in PROF_OR_COURSE_CODE_REGEX.finditer(text):
+        prof_name = prof_name or match.group("prof")
+        course_code = course_code or match.group("code") or match.group("code_in_prof")
+        if prof_name and course_code:
+            break
+
+    if course_code:
+        course_code = course_code.upper()
+        course_code = course_code[:4] + " " + course_code[-3:]
+
+    return prof_name, course_code
+
+def extract_course_code(text):
+    """
+    Extract the first detected course code from a post's title and selftext or a comment's body.
 
-def extract_course_code_from_comment(comment):
-    match = COURSE_CODE_REGEX.search(comment.body)
+    Returns:
+        course_code (str) formatted like 'CISC 121' if found, otherwise None
+    """
+    match = COURSE_CODE_REGEX.search(text)
     
     if match:
-        course_code = match.group(0).replace(" ", "").upper()
-        course_code = re.sub(r"([A-Z]{4})(\d{3})", r"\1 \2", course_code)
+        course_code = match.group(0).upper()
+        # The match is always 4 letters, an optional space, then 3 digits, so rebuild it with a single space
+        course_code = course_code[:4] + " " + course_code[-3:]
         return course_code
     else:
         return None
@@ -180,12 +198,9 @@ def is_post_of_interest(post):
         return False
 
     # Must mention either a course code OR general course-related keywords
-    course_code_regex = r'\b[A-Za-z]{4}\s?\d{3}\b'
-    general_course_keywords = ["courses", "course", "classes", "electives", "program requirements", "bird courses", "easy A"]
-
     full_text = post.title.lower() + " " + post.selftext.lower()
 
-    if not (re.search(course_code_regex, full_text) or any(keyword in full_text for keyword in general_course_keywords)):
+    if not INTEREST_REGEX.search(full_text):
         return False
 
     # (Optional) Filter: avoid locked posts
@@ -208,15 +223,163 @@ def clean_text(text):
     text = re.sub(r'^[a-z]\)', '-', text, flags=re.MULTILINE)
     return text
 
+def process_post(post, courses, professors):
+    """
+    Extract the comments of interest from a single Reddit post.
+    Returns a list of comment_data dicts ready to be inserted into rag_chunks.
+    """
+    # If the post title/description contains a prof name and/or a course code, extract them, otherwise they are None
+    prof_name, course_code = extract_prof_and_course_code(f"{post.title} {post.selftext}")
+
+    # Comments of this post to be inserted
+    rows = []
+
+    # Iterate through the comments of the post
+    # Drop the "load more comments" stubs instead of expanding them (each one costs a Reddit API request),
+    # and walk the already loaded comment tree flat so replies are covered too
+    post.comments.replace_more(limit=0)
+    for comment in post.comments.list():
+        # Read the comment attributes once, the helpers below work on plain values
+        body = comment.body
+        score = comment.score
+        created = comment.created_utc
+
+        # Check to see if the comment is a valid comment
+        if not is_comment_of_interest(body, score):
+            continue
+        
+        # If course_code is not None, use it, otherwise try to find the course code in the comment.
+        # If that fails, skip the comment.
+        # This is to ensure that we have a course code for every comment.
+        temp_course_code = course_code or extract_course_code(body)
+        if not temp_course_code:
+            continue
+
+        # If the professor name is not None, use it, otherwise try to find the professor name in the comment.
+        if not prof_name:
+            prof_name = extract_prof_name(body)
+
+        # The lowercased copy is only needed for tagging
+        body_lower = body.lower()
+
+        # Extract tags from the comment
+        tags = detect_tags(body_lower, already_lower=True)
+
+        # Extract sentiment from the comment
+        sentiment_score, sentiment_label = detect_sentiment(body)
+
+        comment_data = {
+            "text": body,
+            "source": "reddit",
+            "course_code": temp_course_code,
+            "source_url": post.url,
+            "tags": tags,
+            "professor_name": prof_name,
+            "sentiment_score": sentiment_score,
+            "sentiment_label": sentiment_label,
+            "upvotes": score,
+            "created_at": time.strftime("%Y-%m-%d", time.gmtime(created)),  # UTC date, same as the old utcfromtimestamp().date()
+        }
+
+        # If the course code is None (aka 'general_course'), check if there is an associated professor, if not, skip the comment
+        if temp_course_code is None:
+            if prof_name is not None:
+                comment_data["course_code"] = "general_course"
+                rows.append(comment_data)
+
+        # If the course code is in the list of valid courses, insert the comment into the database
+        if temp_course_code is not None and temp_course_code in courses:
+            # If the professor name is in the list of valid professors, insert the comment into the database
+            if prof_name in professors:
+                comment_data["professor_name"] = prof_name
+            else:
+                comment_data["professor_name"] = 'general_prof'
+            
+            rows.append(comment_data)
+
+    return rows
+
+async def _insert_batch(client, batch, semaphore):
+    """
+    Insert a single batch of comments through the PostgREST endpoint.
+    """
+    async with semaphore:
+        response = await client.post("/rest/v1/rag_chunks", content=orjson.dumps(batch))
+        response.raise_for_status()
+
+async def insert_comments(rows, batch_size=INSERT_BATCH_SIZE, max_concurrency=8):
+    """
+    Insert comments into the rag_chunks table.
+    Batches are posted concurrently straight to PostgREST over a single keep-alive HTTP/2 connection,
+    with their JSON bodies encoded by orjson.
+    """
+    headers = {
+        "apikey": supabase.supabase_key,
+        "Authorization": f"Bearer {supabase.supabase_key}",
+        "Content-Type": "application/json",
+        "Prefer": "return=minimal",
+    }
+    batches = [rows[i:i + batch_size] for i in range(0, len(rows), batch_size)]
+    semaphore = asyncio.Semaphore(max_concurrency)
+    async with httpx.AsyncClient(base_url=supabase.supabase_url, headers=headers, http2=True) as client:
+        await asyncio.gather(*(_insert_batch(client, batch, semaphore) for batch in batches))
+
+def load_processed_urls():
+    """
+    Load the post URLs already known to be stored in rag_chunks from the local cache.
+    Returns an empty set if there is no cache yet.
+    """
+    try:
+        with open(PROCESSED_URL_CACHE_PATH) as f:
+            return set(json.load(f))
+    except FileNotFoundError:
+        return set()
+
+def save_processed_urls(processed_urls):
+    """
+    Save the post URLs known to be stored in rag_chunks to the local cache.
+    """
+    with open(PROCESSED_URL_CACHE_PATH, "w") as f:
+        json.dump(sorted(processed_urls), f)
+
+def store_comments(rows, processed_posts_urls):
+    """
+    Insert the comments of fully processed posts, then record their posts in the local processed-URL cache.
+    """
+    if rows:
+        asyncio.run(insert_comments(rows))
+        print(f"✅ Inserted {len(rows)} comments")
+
+    # Remember the posts that now have comments stored for the next run
+    processed_posts_urls.update(row["source_url"] for row in rows)
+    save_processed_urls(processed_posts_urls)
+
 def scrape_and_store(courses, professors):
     subreddit = reddit.subreddit("queensuniversity")
     results = []
 
-    # Fetch already processed posts from Supabase by using post url (source_url)
-    processed_posts = supabase.table("rag_chunks").select("source_url").eq("source", "reddit").execute()
-    processed_posts_urls = {post["source_url"] for post in processed_posts.data}
-
-    for post in subreddit.new(limit=1000):
+    # Collect the candidate posts first so only their URLs have to be checked against Supabase
+    candidate_posts = list(subreddit.new(limit=1000))
+
+    # Candidates already in the local cache are known to be processed, only the rest are checked against Supabase
+    processed_posts_urls = load_processed_urls()
+    candidate_urls = list({post.url for post in candidate_posts} - processed_posts_urls)
+
+    # Fetch which of the remaining candidates were already processed by using post url (source_url),
+    # in chunks so the filter stays within request URL limits
+    for i in range(0, len(candidate_urls), PROCESSED_URL_CHUNK_SIZE):
+        processed_posts = (
+            supabase.table("rag_chunks")
+            .select("source_url")
+            .eq("source", "reddit")
+            .in_("source_url", candidate_urls[i:i + PROCESSED_URL_CHUNK_SIZE])
+            .execute()
+        )
+        processed_posts_urls.update(post["source_url"] for post in processed_posts.data)
+
+    # Collect the posts to process first
+    posts = []
+    for post in candidate_posts:
        
         # Check if the post has already been processed
         if post.url in processed_posts_urls:
@@ -226,71 +389,26 @@ def scrape_and_store(courses, professors):
         # Determine if this is a post of interest, if not, skip it
         if not is_post_of_interest(post):
             continue
-        
-        # If the post title/description contains a course code, extract it, otherwise set to None
-        course_code = extract_course_code_from_post(post)
-        if not course_code:
-            course_code = None
 
-        # If the post title/description contains a prof name, extract it, otherwise set to None
-        prof_name = extract_prof_name_from_post(post)
-        if not prof_name:
-            prof_name = None
-
-        # Iterate through the comments of the post
-        post.comments.replace_more(limit=None)
-        for comment in post.comments:
-            # Check to see if the comment is a valid comment
-            if not is_comment_of_interest(comment):
-                continue
-            
-            # If course_code is not None, use it, otherwise try to find the course code in the comment.
-            # If that fails, skip the comment.
-            # This is to ensure that we have a course code for every comment.
-            temp_course_code = course_code or extract_course_code_from_comment(comment)
-            if not temp_course_code:
-                continue
-
-            # If the professor name is not None, use it, otherwise try to find the professor name in the comment.
-            if not prof_name:
-                prof_name = extract_prof_name_from_comment(comment)
-
-            # Extract tags from the comment
-            tags = detect_tags(comment.body)
-
-            # Extract sentiment from the comment
-            sentiment_score, sentiment_label = detect_sentiment(comment.body)
-
-            comment_data = {
-                "text": comment.body,
-                "source": "reddit",
-                "course_code": temp_course_code,
-                "source_url": post.url,
-                "tags": tags,
-                "professor_name": prof_name,
-                "sentiment_score": sentiment_score,
-                "sentiment_label": sentiment_label,
-                "upvotes": comment.score,
-                "created_at": datetime.utcfromtimestamp(comment.created_utc).date().isoformat(),
-            }
-
-            # If the course code is None (aka 'general_course'), check if there is an associated professor, if not, skip the comment
-            if temp_course_code is None:
-                if prof_name is not None:
-                    comment_data["course_code"] = "general_course"
-                    supabase.table("rag_chunks").insert(comment_data).execute()
-                    results.append(comment_data)
-
-            # If the course code is in the list of valid courses, insert the comment into the database
-            if temp_course_code is not None and temp_course_code in courses:
-                # If the professor name is in the list of valid professors, insert the comment into the database
-                if prof_name in professors:
-                    comment_data["professor_name"] = prof_name
-                else:
-                    comment_data["professor_name"] = 'general_prof'
-                
-                supabase.table("rag_chunks").insert(comment_data).execute()
-                results.append(comment_data)
+        posts.append(post)
+
+    # Process the posts one at a time (PRAW is not thread-safe, and Reddit's rate limit caps throughput anyway).
+    # Comments are stored whenever a full batch has built up, so a failure later on does not lose them
+    pending = []
+    for post in posts:
+        try:
+            rows = process_post(post, courses, professors)
+        except Exception as e:
+            print(f"Skipping post {post.url}, error: {e}")
+            continue
+
+        results.extend(rows)
+        pending.extend(rows)
+        if len(pending) >= INSERT_BATCH_SIZE:
+            store_comments(pending, processed_posts_urls)
+            pending = []
+
+    store_comments(pending, processed_posts_urls)
 
     return results
 
@@ -299,17 +417,13 @@ if __name__ == "__main__":
     supabase = create_supabase_client()
     reddit = setup_reddit()
 
-   # Get all valid courses from Supabase
-    courses_response = supabase.table("courses").select("course_code").execute()
-    courses = courses_response.data  # <-- .data gives you the list
-    courses = [c for c in courses if c["course_code"] != "general_course"]
-    courses = {c["course_code"] for c in courses}
-
-    # Get all valid professors from Supabase
-    professors_response = supabase.table("professors").select("name").execute()
-    professors = professors_response.data
-    professors = [p for p in professors if p["name"] != "general_prof"]
-    professors = {p["name"] for p in professors}
+    # Get all valid courses from Supabase, leaving out the 'general_course' placeholder
+    courses_response = supabase.table("courses").select("course_code").neq("course_code", "general_course").execute()
+    courses = {c["course_code"] for c in courses_response.data}
+
+    # Get all valid professors from Supabase, leaving out the 'general_prof' placeholder
+    professors_response = supabase.table("professors").select("name").neq("name", "general_prof").execute()
+    professors = {p["name"] for p in professors_response.data}
 
     # Scrape and store comments
     scraped_data = scrape_and_store(courses, professors)
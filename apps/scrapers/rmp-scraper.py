@@ -1,5 +1,7 @@
 import requests
+import httpx
 from bs4 import BeautifulSoup
+import soupsieve as sv
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
@@ -7,21 +9,113 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.common.exceptions import NoSuchElementException
 from selenium.common.exceptions import TimeoutException
-import time
-from textblob import TextBlob
+from selenium.common.exceptions import WebDriverException
+from nltk.sentiment.vader import SentimentIntensityAnalyzer
 from supabase import create_client, Client
 import re
-from datetime import datetime
 import os
+import json
+import time
+import base64
+import datetime
+import multiprocessing
+from multiprocessing.util import Finalize
+from concurrent.futures import ThreadPoolExecutor
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36",
     "Referer": "https://www.ratemyprofessors.com/",
     "Accept": "application/json",
+    "Authorization": "Basic dGVzdDp0ZXN0",  # Public credentials used by the RMP frontend for its GraphQL API
 }
 UNIVERSITY_ID = 1466
 UNIVERSITY_NAME = "Queen's University at Kingston"
 
+# RateMyProfessors GraphQL endpoint and the professor search query used by the search page
+GRAPHQL_URL = "https://www.ratemyprofessors.com/graphql"
+TEACHER_SEARCH_QUERY = """
+query TeacherSearchPaginationQuery($count: Int!, $cursor: String, $query: TeacherSearchQuery!) {
+  search: newSearch {
+    teachers(query: $query, first: $count, after: $cursor) {
+      edges {
+        node {
+          legacyId
+          firstName
+          lastName
+          department
+          avgRating
+          numRatings
+          school {
+            name
+          }
+        }
+      }
+      pageInfo {
+        hasNextPage
+        endCursor
+      }
+    }
+  }
+}
+"""
+
+# Number of professors requested per search page
+TEACHER_SEARCH_PAGE_SIZE = 100
+
+# Precompiled CSS selectors for the professor page (most of them run once per review)
+_SEL_OVERALL_RATING = sv.compile("div.RatingValue__Numerator-qw8sqy-2")
+_SEL_FEEDBACK_NUMBERS = sv.compile("div.FeedbackItem__FeedbackNumber-uof32n-1")
+_SEL_TOP_TAGS = sv.compile("div.TeacherTags__TagsContainer-sc-16vmh1y-0 span.Tag-bs9vf4-0")
+_SEL_RATINGS_LIST = sv.compile("ul#ratingsList")
+_SEL_LI = sv.compile("li")
+_SEL_RATING = sv.compile("div.Rating__StyledRating-sc-1rhvpxz-1")
+_SEL_TIMESTAMP = sv.compile("div.TimeStamp__StyledTimeStamp-sc-9q2r30-0")
+_SEL_COURSE = sv.compile("div.RatingHeader__StyledClass-sc-1dlkqw1-3")
+_SEL_QUALITY = sv.compile("div.CardNumRating__CardNumRatingNumber-sc-17t4b9u-2.ERCLc")
+_SEL_DIFFICULTY = sv.compile("div.CardNumRating__CardNumRatingNumber-sc-17t4b9u-2.eBKGNg")
+_SEL_COMMENT = sv.compile("div.Comments__StyledComments-dzzyvm-0")
+_SEL_TAG = sv.compile("span.Tag-bs9vf4-0")
+
+# Precompiled regex patterns for cleaning course codes, comments and review dates
+_WHITESPACE_RE = re.compile(r"\s+")
+_PREFIX_RE = re.compile(r"^[A-Z]+")
+_NUM_RE = re.compile(r"\d+")
+_REVIEW_DATE_RE = re.compile(r"([A-Za-z]{3})\s+(\d{1,2})(?:st|nd|rd|th)?,\s+(\d{4})")
+_PAREN_COUNT_RE = re.compile(r"\(\d+\)")
+
+# Month numbers by lowercased abbreviation, for parsing review dates
+_MONTHS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+# VADER sentiment analyzer (its lexicon is installed with `python -m nltk.downloader vader_lexicon`)
+SENTIMENT_ANALYZER = SentimentIntensityAnalyzer()
+
+# Number of worker processes scraping professor pages, each owning its own Chrome driver
+PROFESSOR_WORKERS = 4
+
+# Number of scraped professors whose rows are written to Supabase together
+PROFESSOR_FLUSH_SIZE = 50
+
+# Maximum number of rag_chunks rows sent in a single insert, keeps each request body small
+RAG_CHUNK_BATCH_SIZE = 100
+
+# Number of rag_chunks inserts sent concurrently
+INSERT_WORKERS = 8
+
+# Number of rag_chunks rows read per request when loading the existing reviews
+EXISTING_REVIEWS_PAGE_SIZE = 1000
+
+# Local checkpoint of the scraped professor list, reused by a re-run while it is fresh
+PROFESSOR_CACHE_PATH = os.getenv("PROFESSOR_CACHE_PATH", ".rmp_professors_cache.json")
+PROFESSOR_CACHE_MAX_AGE = 12 * 60 * 60  # seconds
+
+# Per-process Chrome driver (and the finalizer that quits it) and course index, set up once by _init_worker
+_worker_driver = None
+_worker_driver_finalizer = None
+_worker_course_index = None
+
 def create_supabase_client():
     """
     Create a Supabase client using environment variables for URL and key.
@@ -31,6 +125,20 @@ def create_supabase_client():
     supabase: Client = create_client(SUPABASE_URL,SUPABASE_KEY)
     return supabase
 
+def create_chrome_driver():
+    """
+    Create a headless Chrome driver.
+    """
+    options = Options()
+    options.add_argument("--headless")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--log-level=3")
+    # Return once the DOM is ready instead of waiting for images and other sub-resources,
+    # the scraper waits for the elements it needs explicitly
+    options.page_load_strategy = "eager"
+    return webdriver.Chrome(options=options)
+
 def is_valid_comment(comment):
     """
     Check if the comment is valid based on certain criteria.
@@ -52,93 +160,111 @@ def get_all_valid_courses(supabase):
     
     return valid_course_codes
 
-def clean_and_map_course_codes(course_codes, valid_courses):
+def split_course_code(cleaned):
+    """
+    Split a cleaned course code into its leading letters (None if there are none) and its runs of digits.
+    """
+    prefix_match = _PREFIX_RE.match(cleaned)
+    return (prefix_match.group(0) if prefix_match else None), _NUM_RE.findall(cleaned)
+
+def build_course_index(valid_courses):
+    """
+    Precompute the lookups used by clean_and_map_course_codes from the valid courses, once per run.
+    Returns a dict with:
+        no_space: cleaned course code ('CISC121') -> valid course code ('CISC 121')
+        prefixes: every leading run of capital letters of a valid course code ('C', 'CI', 'CIS', 'CISC')
+        depts_by_num: 3 character course number -> dept codes that offer it
+        parts: cleaned course code -> its letter prefix and digit runs, for the common case of scraped codes that are already valid
+    """
+    no_space = {course.replace(" ", "").upper(): course for course in valid_courses}
+    parts = {cleaned: split_course_code(cleaned) for cleaned in no_space}
+
+    prefixes = set()
+    for course in valid_courses:
+        prefix_match = _PREFIX_RE.match(course.replace(" ", ""))
+        letters = prefix_match.group(0) if prefix_match else ""
+        prefixes.update(letters[:i] for i in range(1, len(letters) + 1))
+
+    depts_by_num = {}
+    for course in valid_courses:
+        dept, _, num = course.rpartition(" ")
+        if len(num) == 3:
+            depts_by_num.setdefault(num, set()).add(dept)
+
+    return {"no_space": no_space, "prefixes": prefixes, "depts_by_num": depts_by_num, "parts": parts}
+
+def clean_and_map_course_codes(course_codes, course_index):
     """
     Refined two-pass system to clean messy scraped course codes.
     """
+    valid_courses_no_space = course_index["no_space"]
+    valid_prefixes = course_index["prefixes"]
+    valid_depts_by_num = course_index["depts_by_num"]
+    valid_parts = course_index["parts"]
 
     # --- Step 1: Build valid dept codes, number codes, and derived clean courses ---
     valid_dept_codes = set()
     valid_num_codes = set()
-    derived_valid_courses = set()
-
-    valid_courses_no_space = {course.replace(" ", "").upper(): course for course in valid_courses}
+    derived_courses_by_num = {}
+    cleaned_codes = {}
 
     for raw_code in course_codes:
         cleaned = raw_code.strip().replace(" ", "").upper()
+        cleaned_codes[raw_code] = cleaned
 
-        # Extract prefix and number parts
-        prefix_match = re.match(r"^[A-Z]+", cleaned)
-        number_parts = re.findall(r"\d+", cleaned)
-
-        if prefix_match:
-            prefix = prefix_match.group(0)
+        # Extract prefix and number parts, already known when the code is a valid course
+        parts = valid_parts.get(cleaned)
+        prefix, number_parts = parts if parts else split_course_code(cleaned)
 
+        if prefix:
             # Check if prefix matches any valid course
-            for valid in valid_courses:
-                if valid.replace(" ", "").startswith(prefix):
-                    valid_dept_codes.add(prefix)
-                    break
+            if prefix in valid_prefixes:
+                valid_dept_codes.add(prefix)
 
         for num in number_parts:
             if len(num) >= 3:
                 num = num[:3]
                 # Try matching this number with known prefixes
-                for dept in valid_dept_codes:
-                    candidate = f"{dept} {num}"
-                    if candidate in valid_courses:
-                        valid_num_codes.add(num)
-                        derived_valid_courses.add(candidate)
+                depts = valid_dept_codes & valid_depts_by_num.get(num, set())
+                if depts:
+                    valid_num_codes.add(num)
+                    derived_courses_by_num.setdefault(num, set()).update(f"{dept} {num}" for dept in depts)
 
     # --- Step 2: Build mapping ---
     course_mapping = {}
 
-    for raw_code in course_codes:
+    for raw_code, cleaned in cleaned_codes.items():
+        # Fast path: exact match to known valid courses
+        if cleaned in valid_courses_no_space:
+            course_mapping[raw_code] = [valid_courses_no_space[cleaned]]
+            continue
+
         matches = []
-        cleaned = raw_code.strip().replace(" ", "").upper()
+        prefix, number_parts = split_course_code(cleaned)
 
-        # Exact match to known valid courses first
-        if cleaned in valid_courses_no_space:
-            matches.append(valid_courses_no_space[cleaned])
+        if prefix and number_parts:
+            suffix = cleaned[len(prefix):]
 
-        else:
-            prefix_match = re.match(r"^[A-Z]+", cleaned)
-            number_parts = re.findall(r"\d+", cleaned)
-
-            if prefix_match and number_parts:
-                prefix = prefix_match.group(0)
-                suffix = cleaned[len(prefix):]
-
-                # Try to build full courses
-                idx = 0
-                while idx < len(suffix):
-                    num = suffix[idx:idx+3]
-                    idx += 3
-
-                    for dept in valid_dept_codes:
-                        candidate = f"{dept} {num}"
-                        if candidate in derived_valid_courses:
-                            matches.append(candidate)
-
-            elif cleaned.isdigit() and len(cleaned) == 3:
-                # Just numbers
-                num = cleaned
-                if num in valid_num_codes:
-                    for dept in valid_dept_codes:
-                        candidate = f"{dept} {num}"
-                        if candidate in derived_valid_courses:
-                            matches.append(candidate)
-                else:
-                    matches = None
-
-            elif cleaned.isalpha():
-                # Only letters (ANAT) => ambiguous
-                matches = None
+            # Try to build full courses from each 3 character chunk of the suffix
+            for idx in range(0, len(suffix), 3):
+                matches.extend(derived_courses_by_num.get(suffix[idx:idx+3], ()))
 
+        elif cleaned.isdigit() and len(cleaned) == 3:
+            # Just numbers
+            num = cleaned
+            if num in valid_num_codes:
+                matches.extend(derived_courses_by_num[num])
             else:
                 matches = None
 
-        if len(matches) == 1:
+        elif cleaned.isalpha():
+            # Only letters (ANAT) => ambiguous
+            matches = None
+
+        else:
+            matches = None
+
+        if matches and len(matches) == 1:
             course_mapping[raw_code] = matches
         else:
             course_mapping[raw_code] = None
@@ -147,11 +273,10 @@ def clean_and_map_course_codes(course_codes, valid_courses):
 
 def detect_sentiment(text):
     """
-    Determine the sentiment of a given text using TextBlob.
+    Determine the sentiment of a given text using the VADER lexicon.
     returns a sentiment_score (float between -1 and 1) and a sentiment_label (very positive, positive, neutral, negative, very negative).
     """
-    blob = TextBlob(text)
-    sentiment_score = blob.sentiment.polarity
+    sentiment_score = SENTIMENT_ANALYZER.polarity_scores(text)["compound"]
     if sentiment_score > 0.5:
         sentiment_label = "very positive"
     elif sentiment_score > 0.2:
@@ -166,98 +291,104 @@ def detect_sentiment(text):
     return sentiment_score, sentiment_label
 
 def scrape_professors(supabase, testing=True):
-    url = f"https://www.ratemyprofessors.com/search/professors/{UNIVERSITY_ID}?q=*"
-
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--log-level=3")
-    driver = webdriver.Chrome(options=options)
+    """
+    Get every professor of the university from the RateMyProfessors GraphQL search API.
+    Pages through the results with the cursor returned in pageInfo instead of clicking "Show More" in a browser.
+    """
+    # GraphQL node ids are the base64 of "<Type>-<legacy id>"
+    school_id = base64.b64encode(f"School-{UNIVERSITY_ID}".encode()).decode()
 
-    professors = []
+    # Professors are supposed to be unique according to the name, so they are keyed by name as they are collected
+    professors = {}
     seen_professor_ids = set()
-    previous_count = 0
-    
-    try:
-        driver.get(url)
-        WebDriverWait(driver, 10).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "TeacherCard__StyledTeacherCard-syjs0d-0"))
-        )
+    cursor = ""
 
-        while True:
-            time.sleep(1)  # tiny wait to avoid rapid clicking
+    with requests.Session() as session:
+        session.headers.update(HEADERS)
 
-            # Get professor cards
-            professor_cards = driver.find_elements(By.CLASS_NAME, "TeacherCard__StyledTeacherCard-syjs0d-0")
-            for card in professor_cards[previous_count:]:
-                try:
-                    name = card.find_element(By.CLASS_NAME, "CardName__StyledCardName-sc-1gyrgim-0").text
-                    department = card.find_element(By.CLASS_NAME, "CardSchool__Department-sc-19lmz2k-0").text
-                    school = card.find_element(By.CLASS_NAME, "CardSchool__School-sc-19lmz2k-1").text
-                    rating = card.find_element(By.CLASS_NAME, "CardNumRating__CardNumRatingNumber-sc-17t4b9u-2").text
-                    num_ratings = card.find_element(By.CLASS_NAME, "CardNumRating__CardNumRatingCount-sc-17t4b9u-3").text # formatted as "X ratings"
-                    num_ratings = int(num_ratings.split()[0].replace(",", ""))  # Convert to integer
-
-                    # NEW: Extract href directly from card
-                    prof_url = card.get_attribute("href")
-                    
-                    # Make URL absolute if needed
-                    if prof_url.startswith("/"):
-                        prof_url = f"https://www.ratemyprofessors.com{prof_url}"
-
-                    prof_id = prof_url.rstrip('/').split('/')[-1]
-
-                    if prof_id not in seen_professor_ids:
-                        seen_professor_ids.add(prof_id)
-
-                        professors.append({
-                            "id": prof_id,
-                            "name": name,
-                            "department": department,
-                            "school": school,
-                            "overall_rating": rating,
-                            "num_ratings": num_ratings,
-                            "url": prof_url,
-                        })
-
-                    print(name, "extracted")
-        
-                except Exception as e:
-                    print(f"Error extracting professor data: {e}")
-
-            previous_count = len(professor_cards)
-
-            # Check for "Show More" button
-            try:
-                show_more_button = driver.find_element(By.XPATH, "//button[contains(text(), 'Show More')]")
-                
-                # Safety: check if it's visible and enabled
-                if show_more_button.is_displayed() and show_more_button.is_enabled():
-                    show_more_button.click()
-                    # print("Clicked 'Show More'")
-                else:
-                    # print("'Show More' button not clickable anymore.")
-                    break
-
-            except NoSuchElementException:
-                # print("No 'Show More' button found at all.")
+        while True:
+            response = session.post(GRAPHQL_URL, json={
+                "query": TEACHER_SEARCH_QUERY,
+                "variables": {
+                    "count": TEACHER_SEARCH_PAGE_SIZE,
+                    "cursor": cursor,
+                    "query": {"text": "", "schoolID": school_id, "fallback": False},
+                },
+            })
+            response.raise_for_status()
+            teachers = response.json()["data"]["search"]["teachers"]
+
+            for edge in teachers["edges"]:
+                node = edge["node"]
+                prof_id = str(node["legacyId"])
+                name = f"{node['firstName']} {node['lastName']}"
+
+                if prof_id not in seen_professor_ids:
+                    seen_professor_ids.add(prof_id)
+
+                    professors[name] = {
+                        "id": prof_id,
+                        "name": name,
+                        "department": node["department"],
+                        "school": node["school"]["name"],
+                        "overall_rating": node["avgRating"],
+                        "num_ratings": node["numRatings"],
+                        "url": f"https://www.ratemyprofessors.com/professor/{prof_id}",
+                    }
+
+                print(name, "extracted")
+
+            # Stop when there are no more pages
+            if not teachers["pageInfo"]["hasNextPage"]:
                 break
+            cursor = teachers["pageInfo"]["endCursor"]
 
             # Testing mode: Limit pages
             if testing and len(professors) > 20:
                 break
 
-    finally:
-        driver.quit()
+    return professors.values()
 
-    # Professors are supposed to be unique according to the name
-    professors = {prof["name"]: prof for prof in professors}.values()
+def load_cached_professors():
+    """
+    Load the professor list saved by a previous run.
+    Returns None if there is no checkpoint or it is older than PROFESSOR_CACHE_MAX_AGE.
+    """
+    try:
+        if time.time() - os.path.getmtime(PROFESSOR_CACHE_PATH) > PROFESSOR_CACHE_MAX_AGE:
+            return None
+        with open(PROFESSOR_CACHE_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+def save_professors_cache(professors):
+    """
+    Save the scraped professor list so an interrupted run can skip the listing when it is restarted.
+    """
+    with open(PROFESSOR_CACHE_PATH, "w") as f:
+        json.dump(list(professors), f)
 
-    return professors
+def parse_review_date(text):
+    """
+    Convert a review date like 'Apr 5th, 2024' to an ISO date ('2024-04-05').
+    Raises ValueError if the text is not in that format or is not a real date (e.g. 'Feb 30th, 2024').
+    """
+    match = _REVIEW_DATE_RE.fullmatch(text)
+    if not match or match.group(1).lower() not in _MONTHS:
+        raise ValueError(f"Unrecognized review date: {text!r}")
+    month, day, year = match.groups()
+    return datetime.date(int(year), _MONTHS[month.lower()], int(day)).isoformat()
 
 def normalize_comment(text):
-    return re.sub(r"\s+", " ", text.strip().lower())    
+    return _WHITESPACE_RE.sub(" ", text.strip().lower())    
+
+def review_key(text, date):
+    """
+    Key used to detect duplicate reviews, the hash of the review text and date.
+    Only compared within one process, so Python's built-in hash is enough.
+    """
+    return hash((text, date))
 
 def to_scrape_professor(supabase, professors):
     '''
@@ -296,20 +427,131 @@ def safe_float(text):
     except (ValueError, TypeError):
         return None 
 
-def scrape_professor_comments(supabase, prof, valid_courses):
+def get_existing_reviews(supabase):
     """
-    Given a professor object scrape detailed rating information.
+    Get the text and date of every RateMyProfessors review in the database, grouped by professor name.
+    Reads the table a page at a time, ordered by primary key, since PostgREST caps the number of rows per response.
     """
-    
-    # --- Set up headless Chrome ---
-    options = Options()
-    options.add_argument("--headless")
-    options.add_argument("--disable-gpu")
-    options.add_argument("--no-sandbox")
-    options.add_argument("--log-level=3")
+    existing_reviews = {}
+    start = 0
+    while True:
+        page = (
+            supabase.table("rag_chunks")
+            .select("text, created_at, professor_name")
+            .eq("source", "ratemyprofessors")
+            .order("id")  # A stable order on the primary key, so pages neither skip nor repeat rows
+            .range(start, start + EXISTING_REVIEWS_PAGE_SIZE - 1)
+            .execute()
+            .data
+        )
+        for r in page:
+            existing_reviews.setdefault(r["professor_name"], []).append((r["text"], r["created_at"]))
+
+        if len(page) < EXISTING_REVIEWS_PAGE_SIZE:
+            break
+        start += EXISTING_REVIEWS_PAGE_SIZE
 
-    driver = webdriver.Chrome(options=options)
-    driver.set_page_load_timeout(20)
+    return existing_reviews
+
+def create_postgrest_client(supabase):
+    """
+    Create a persistent HTTP/2 client for the PostgREST endpoint of the Supabase project,
+    so every flush reuses the same keep-alive connection instead of opening a new one.
+    """
+    headers = {
+        "apikey": supabase.supabase_key,
+        "Authorization": f"Bearer {supabase.supabase_key}",
+    }
+    return httpx.Client(
+        base_url=supabase.supabase_url,
+        headers=headers,
+        http2=True,
+        limits=httpx.Limits(max_keepalive_connections=20, keepalive_expiry=60),
+    )
+
+def flush_to_supabase(client, profs_buffer, chunks_buffer):
+    """
+    Write the buffered professors and reviews to Supabase in batches through the PostgREST client.
+    Reviews are inserted before their professors are upserted, so a professor's latest_comment_date never gets ahead of the stored reviews.
+    """
+    def insert_batch(batch):
+        response = client.post("/rest/v1/rag_chunks", json=batch, headers={"Prefer": "return=minimal"})
+        response.raise_for_status()
+
+    # Send the review batches concurrently over the shared client, list() waits for all of them and re-raises any error
+    batches = [chunks_buffer[i:i + RAG_CHUNK_BATCH_SIZE] for i in range(0, len(chunks_buffer), RAG_CHUNK_BATCH_SIZE)]
+    with ThreadPoolExecutor(max_workers=INSERT_WORKERS) as executor:
+        list(executor.map(insert_batch, batches))
+
+    if profs_buffer:
+        response = client.post(
+            "/rest/v1/professors",
+            params={"on_conflict": "id"},
+            json=profs_buffer,
+            headers={"Prefer": "resolution=merge-duplicates,return=minimal"},
+        )
+        response.raise_for_status()
+
+    print(f"✅ Inserted {len(chunks_buffer)} reviews for {len(profs_buffer)} professors")
+
+def _init_worker(course_index):
+    """
+    Create the Chrome driver of a worker process and keep the course index, so it is sent to each worker only once.
+    The driver is quit when the worker exits.
+    """
+    global _worker_course_index
+    _worker_course_index = course_index
+    _start_worker_driver()
+
+def _start_worker_driver():
+    """
+    Create the worker process's Chrome driver and register it to be quit when the worker exits.
+    """
+    global _worker_driver, _worker_driver_finalizer
+    _worker_driver = create_chrome_driver()
+    _worker_driver.set_page_load_timeout(20)
+    _worker_driver_finalizer = Finalize(None, _worker_driver.quit, exitpriority=10)
+
+def _restart_worker_driver():
+    """
+    Quit the worker process's driver, ignoring errors from a crashed browser, and start a new one.
+    """
+    try:
+        _worker_driver_finalizer()
+    except Exception:
+        pass
+    _start_worker_driver()
+
+def _scrape_professor_worker(prof):
+    """
+    Scrape a single professor with the worker process's driver.
+    Cookies are cleared first so no session state carries over from the previous professor.
+    If the driver itself fails (e.g. Chrome crashed), it is replaced and the professor is retried once.
+    Other errors are logged and the professor is skipped, so one bad page does not abort the whole pool.
+    """
+    try:
+        try:
+            _worker_driver.delete_all_cookies()
+            return scrape_professor_comments(_worker_driver, prof, _worker_course_index)
+        except (TimeoutException, NoSuchElementException):
+            # The page did not render as expected, the driver itself is fine
+            raise
+        except WebDriverException as e:
+            print(f"Driver error while scraping {prof['name']}, restarting the driver and retrying: {e}")
+            _restart_worker_driver()
+            _worker_driver.delete_all_cookies()
+            return scrape_professor_comments(_worker_driver, prof, _worker_course_index)
+    except Exception as e:
+        print(f"Error scraping {prof['name']}, skipping: {e}")
+        return None
+
+def scrape_professor_comments(driver, prof, course_index):
+    """
+    Given a professor object scrape detailed rating information.
+    The driver is owned by the caller and reused across professors, and the professor's
+    stored reviews are expected in prof["existing_reviews"] (see get_existing_reviews).
+    Returns the updated professor row and its new rag_chunks rows, or None if the page could not be loaded.
+    """
 
     # Log Message
     print(f"Scraping comments for {prof['name']}...")
@@ -317,231 +559,243 @@ def scrape_professor_comments(supabase, prof, valid_courses):
     print(prof["url"])
 
     try:
-        try:
-            driver.get(prof["url"])
-        except TimeoutException:
-            print(f"Timeout while loading {prof['url']}. Skipping...")
-            return
-        
-        WebDriverWait(driver, 5).until(
-            EC.presence_of_element_located((By.CLASS_NAME, "RatingValue__Numerator-qw8sqy-2"))
-        )
-        soup = BeautifulSoup(driver.page_source, "html.parser")
-
-        has_reviews = prof["num_ratings"] > 0
-
-        # Extract items from the professors page
-
-        # 1) Overall Rating
-        rating_elem = soup.select_one("div.RatingValue__Numerator-qw8sqy-2")
-        overall_rating = None
-        if has_reviews:
-            text = rating_elem.text.strip() if rating_elem else None
-            overall_rating = safe_float(text)
-
-        # 2) % would take again and overall difficulty rating
-        feedback_numbers = soup.select("div.FeedbackItem__FeedbackNumber-uof32n-1")
-        percent_take_again = None
-        level_of_difficulty = None
-        if has_reviews:
-            if len(feedback_numbers) > 0:
-                percent_take_again = safe_float(feedback_numbers[0].text.strip('%'))
-            if len(feedback_numbers) > 1:
-                level_of_difficulty = safe_float(feedback_numbers[1].text.strip())
-
-        # 3) Top Tags
-        top_tags = [
-            tag.text.strip()
-            for tag in soup.select("div.TeacherTags__TagsContainer-sc-16vmh1y-0 span.Tag-bs9vf4-0")
-        ]
-
-        # 4) All of the courses that the professor has been reviewed on
-        # Find the dropdown div and click it to open
-        dropdown_button = driver.find_element(By.CLASS_NAME, "Select__getDropdownIndicator-sc-9f4k3m-0")
-        dropdown_button.click()
-
-        # After clicking the dropdown
-        time.sleep(1)  # Wait for animation to open (can also do WebDriverWait instead)
-
-        # Scrape all course options
-        course_menu = driver.find_element(By.CLASS_NAME, "css-1ogydhz-menu")
-        menu_text = course_menu.text
-        # split if by newlines
-        raw_courses = menu_text.split("\n")
-
-        all_courses = set()
-        for course in raw_courses:
-            cleaned = re.sub(r"\(\d+\)", "", course).strip()
-            if cleaned and cleaned.lower() != "all courses":
-                all_courses.add(cleaned)
-
-        course_code_mappings = clean_and_map_course_codes(all_courses, valid_courses)
-
-        # Get all of the previous comments from the database
-        response = supabase.table("rag_chunks").select("text", "created_at").eq("professor_name", prof["name"]).execute()
-        existing_reviews_set = set((r["text"].strip(), r["created_at"]) for r in response.data)
-        seen_reviews_set = set()
+        driver.get(prof["url"])
+    except TimeoutException:
+        print(f"Timeout while loading {prof['url']}. Skipping...")
+        return None
+    
+    WebDriverWait(driver, 5).until(
+        EC.presence_of_element_located((By.CLASS_NAME, "RatingValue__Numerator-qw8sqy-2"))
+    )
+    soup = BeautifulSoup(driver.page_source, "lxml")
+
+    has_reviews = prof["num_ratings"] > 0
+
+    # Extract items from the professors page
+
+    # 1) Overall Rating
+    rating_elem = _SEL_OVERALL_RATING.select_one(soup)
+    overall_rating = None
+    if has_reviews:
+        text = rating_elem.text.strip() if rating_elem else None
+        overall_rating = safe_float(text)
+
+    # 2) % would take again and overall difficulty rating
+    feedback_numbers = _SEL_FEEDBACK_NUMBERS.select(soup)
+    percent_take_again = None
+    level_of_difficulty = None
+    if has_reviews:
+        if len(feedback_numbers) > 0:
+            percent_take_again = safe_float(feedback_numbers[0].text.strip('%'))
+        if len(feedback_numbers) > 1:
+            level_of_difficulty = safe_float(feedback_numbers[1].text.strip())
+
+    # 3) Top Tags
+    top_tags = [
+        tag.text.strip()
+        for tag in _SEL_TOP_TAGS.select(soup)
+    ]
+
+    # 4) All of the courses that the professor has been reviewed on
+    # Find the dropdown div and click it to open
+    dropdown_button = driver.find_element(By.CLASS_NAME, "Select__getDropdownIndicator-sc-9f4k3m-0")
+    dropdown_button.click()
+
+    # Wait for the dropdown menu to open, then scrape all course options
+    course_menu = WebDriverWait(driver, 10).until(
+        EC.presence_of_element_located((By.CLASS_NAME, "css-1ogydhz-menu"))
+    )
+    menu_text = course_menu.text
+    # split if by newlines
+    raw_courses = menu_text.split("\n")
+
+    all_courses = set()
+    for course in raw_courses:
+        cleaned = _PAREN_COUNT_RE.sub("", course).strip()
+        if cleaned and cleaned.lower() != "all courses":
+            all_courses.add(cleaned)
+
+    course_code_mappings = clean_and_map_course_codes(all_courses, course_index)
+
+    # Reviews already in the database count as seen, so new reviews only need one membership check
+    seen_reviews_set = {review_key(text.strip(), created_at) for text, created_at in prof["existing_reviews"]}
+    
+    # Start loopin through all of the comments
+    # The original text of each kept review is collected alongside it for sentiment scoring
+    reviews = []
+    review_comments = []
+    stop_scraping = False
+
+    # Number of review items already parsed, the reviews loaded by "Load More Ratings" are appended after them
+    parsed_count = 0
+
+    while True:
+        # If the prof has no reviews, skip to the next one
+        if not has_reviews:
+            break
+
+        # --- Extract Student Reviews ---
+        reviews_list = _SEL_RATINGS_LIST.select_one(soup)
+        review_items = _SEL_LI.select(reviews_list) if reviews_list else []
         
-        # Start loopin through all of the comments
-        reviews = []
-        stop_scraping = False
+        # Loop through the reviews that were not parsed yet
+        for block in review_items[parsed_count:]:
+            # Check if it is not an ad
+            rating_div = _SEL_RATING.select_one(block)
 
-        while True:
-            time.sleep(1)
+            if rating_div:
+                try:
+                    # Get the date, as an ISO date string
+                    date = parse_review_date(_SEL_TIMESTAMP.select_one(block).text.strip())
 
-            # If the prof has no reviews, skip to the next one
-            if not has_reviews:
-                break
+                    # Check to see if the date is more recent than the latest comment date
 
-            # --- Extract Student Reviews ---
-            reviews_list = soup.select_one("ul#ratingsList")
-            review_items = reviews_list.select("li") if reviews_list else []
-            
-            # Loop through all of the reviews
-            for block in review_items:
-                # Check if it is not an ad
-                rating_div = block.select_one("div.Rating__StyledRating-sc-1rhvpxz-1")
-
-                if rating_div:
-                    try:
-                        # Get the date
-                        date = block.select_one("div.TimeStamp__StyledTimeStamp-sc-9q2r30-0").text.strip()
-                        # Remove the "th", "st", "nd", "rd" from the date string
-                        date = re.sub(r"(\d+)(st|nd|rd|th)", r"\1", date)
-                        # Convert the date to a datetime object
-                        date = datetime.strptime(date, "%b %d, %Y").date().isoformat()
-
-                        # Check to see if the date is more recent than the latest comment date
-
-                        if prof["latest_comment_date"] is not None:
-                            if date <= prof["latest_comment_date"]:
-                                stop_scraping = True
-                                break
-
-                        # Get the mapped course code
-                        scraped_course_code = block.select_one("div.RatingHeader__StyledClass-sc-1dlkqw1-3").text.strip()
-                        course_codes = course_code_mappings[scraped_course_code]
-                        
-                        quality_elem = block.select_one("div.CardNumRating__CardNumRatingNumber-sc-17t4b9u-2.ERCLc")
-                        difficulty_elem = block.select_one("div.CardNumRating__CardNumRatingNumber-sc-17t4b9u-2.eBKGNg")
-
-                        if quality_elem:
-                            quality = float(quality_elem.text.strip())
-                        else:
-                            quality = overall_rating  # fallback
-                        
-                        if difficulty_elem:
-                            difficulty = float(difficulty_elem.text.strip())
-                        else:
-                            difficulty = level_of_difficulty  # fallback
-                        
-                        comment = block.select_one("div.Comments__StyledComments-dzzyvm-0").text.strip()
-                        
-                        # Check to see if the review is valid
-                        if not is_valid_comment(comment):
-                            continue
-
-                        sentiment_score, sentiment_label = detect_sentiment(comment)
+                    if prof["latest_comment_date"] is not None:
+                        if date <= prof["latest_comment_date"]:
+                            stop_scraping = True
+                            break
+
+                    # Get the mapped course code
+                    scraped_course_code = _SEL_COURSE.select_one(block).text.strip()
+                    course_codes = course_code_mappings[scraped_course_code]
                     
-                        tag_spans = block.select("span.Tag-bs9vf4-0")
-                        review_tags = [tag.text.strip() for tag in tag_spans]
-
-                        if not course_codes:
-                            course_codes = ["general_course"]
-
-                        # Check to see if the review is a duplicate
-                        normalized_comment = normalize_comment(comment)
-                        if (normalized_comment, date) in existing_reviews_set or (normalized_comment, date) in seen_reviews_set:
-                            continue
-                        seen_reviews_set.add((normalized_comment, date))
-
-                        parsed_review = {
-                            "date": date,
-                            "quality": quality,
-                            "difficulty": difficulty,
-                            "comment": normalized_comment,
-                            "tags": review_tags,
-                            "sentiment_score": sentiment_score,
-                            "sentiment_label": sentiment_label,
-                            "course_code": course,
-                        }
-
-                        reviews.append(parsed_review)
-                        
-                    except Exception as e:
-                        print(f"Skipping one review, error: {e}")
-            if stop_scraping:
-                break
-            # Check for "Load More Ratings" button
-            try:
-                load_more_button = driver.find_element(By.XPATH, "//button[contains(text(), 'Load More Ratings')]")
-                
-                # Safety: check if it's visible and enabled
-                if load_more_button.is_displayed() and load_more_button.is_enabled():
-                    load_more_button.click()
-                    # print("Clicked 'Load More Ratings'")
-                else:
-                    # print("'Load More Ratings' button not clickable anymore.")
-                    break
-            except NoSuchElementException:
-                # print("No 'Load More Ratings' button found at all.")
+                    quality_elem = _SEL_QUALITY.select_one(block)
+                    difficulty_elem = _SEL_DIFFICULTY.select_one(block)
+
+                    if quality_elem:
+                        quality = float(quality_elem.text.strip())
+                    else:
+                        quality = overall_rating  # fallback
+                    
+                    if difficulty_elem:
+                        difficulty = float(difficulty_elem.text.strip())
+                    else:
+                        difficulty = level_of_difficulty  # fallback
+                    
+                    comment = _SEL_COMMENT.select_one(block).text.strip()
+
+                    # Normalize the comment once, the normalized form is validated, deduplicated and stored
+                    normalized_comment = normalize_comment(comment)
+
+                    # Check to see if the review is valid
+                    if not is_valid_comment(normalized_comment):
+                        continue
+
+                    # Check to see if the review is a duplicate
+                    key = review_key(normalized_comment, date)
+                    if key in seen_reviews_set:
+                        continue
+                    seen_reviews_set.add(key)
+
+                    tag_spans = _SEL_TAG.select(block)
+                    review_tags = [tag.text.strip() for tag in tag_spans]
+
+                    if not course_codes:
+                        course_codes = ["general_course"]
+
+                    parsed_review = {
+                        "date": date,
+                        "quality": quality,
+                        "difficulty": difficulty,
+                        "comment": normalized_comment,
+                        "tags": review_tags,
+                        "course_code": course_codes[0],
+                    }
+
+                    reviews.append(parsed_review)
+                    review_comments.append(comment)
+                    
+                except Exception as e:
+                    print(f"Skipping one review, error: {e}")
+        if stop_scraping:
+            break
+        parsed_count = len(review_items)
+        # Check for "Load More Ratings" button
+        try:
+            load_more_button = driver.find_element(By.XPATH, "//button[contains(text(), 'Load More Ratings')]")
+            
+            # Safety: check if it's visible and enabled
+            if load_more_button.is_displayed() and load_more_button.is_enabled():
+                load_more_button.click()
+                # print("Clicked 'Load More Ratings'")
+
+                # Wait for the next reviews to render, then re-read the page so they are parsed
+                WebDriverWait(driver, 10).until(
+                    lambda d: len(d.find_elements(By.CSS_SELECTOR, "ul#ratingsList li")) > len(review_items)
+                )
+                soup = BeautifulSoup(driver.page_source, "lxml")
+            else:
+                # print("'Load More Ratings' button not clickable anymore.")
                 break
+        except NoSuchElementException:
+            # print("No 'Load More Ratings' button found at all.")
+            break
+        except TimeoutException:
+            break
 
-        date = None
-        if len(reviews) > 0:
-            date = reviews[0]["date"]
-        
-        # Update the professor object with the scraped data
-        updated_prof = {
-            "id": prof["id"],
-            "name": prof["name"],
-            "overall_rating": overall_rating,
-            "percent_retake": percent_take_again,
-            "level_of_difficulty": level_of_difficulty,
-            "professor_tags": top_tags,
-            "latest_comment_date": date,
-            "num_ratings": prof["num_ratings"],
-            "url": prof["url"],
+    # Score the sentiment of the new reviews in one pass, after invalid and duplicate reviews were dropped,
+    # using the original text since VADER takes capitalization into account
+    for review, comment in zip(reviews, review_comments):
+        review["sentiment_score"], review["sentiment_label"] = detect_sentiment(comment)
+
+    date = None
+    if len(reviews) > 0:
+        date = reviews[0]["date"]
+    
+    # Update the professor object with the scraped data
+    updated_prof = {
+        "id": prof["id"],
+        "name": prof["name"],
+        "overall_rating": overall_rating,
+        "percent_retake": percent_take_again,
+        "level_of_difficulty": level_of_difficulty,
+        "professor_tags": top_tags,
+        "latest_comment_date": date,
+        "num_ratings": prof["num_ratings"],
+        "url": prof["url"],
+    }
+
+
+    # Build the reviews to be inserted into the database
+    prof_name = prof["name"]
+    prof_url = prof["url"]
+    comment_data_batch = [
+        {
+            "text": review["comment"],
+            "source": "ratemyprofessors",
+            "course_code": review["course_code"],
+            "professor_name": prof_name,
+            "source_url": prof_url,
+            "tags": review["tags"],
+            "created_at": review["date"],
+            "quality_rating": review["quality"],
+            "sentiment_score": review["sentiment_score"],
+            "sentiment_label": review["sentiment_label"],
+            "difficulty_rating": review["difficulty"],
         }
-        
-        supabase.table("professors").upsert(updated_prof, on_conflict=["id"]).execute()
-
-        # Insert the reviews into the database
-        if reviews:
-            comment_data_batch = []
-            for review in reviews:
-                comment_data = {
-                    "text": review["comment"],
-                    "source": "ratemyprofessors",
-                    "course_code": review["course_code"],
-                    "professor_name": prof["name"],
-                    "source_url": prof["url"],
-                    "tags": review["tags"],
-                    "created_at": review["date"],
-                    "quality_rating": review["quality"],
-                    "sentiment_score": review["sentiment_score"],
-                    "sentiment_label": review["sentiment_label"],
-                    "difficulty_rating": review["difficulty"],
-                }
-                comment_data_batch.append(comment_data)
-
-            supabase.table("rag_chunks").insert(comment_data_batch).execute()
-            print(f"Inserted {len(comment_data_batch)} reviews for {prof['name']}")
-        else:
-            print(f"No reviews found for {prof['name']}")
+        for review in reviews
+    ]
 
-    finally:
-        driver.quit()
+    if comment_data_batch:
+        print(f"Scraped {len(comment_data_batch)} reviews for {prof['name']}")
+    else:
+        print(f"No reviews found for {prof['name']}")
+
+    return updated_prof, comment_data_batch
 
-    
 
 
 if __name__ == "__main__":
     # Create Supabase client
     supabase = create_supabase_client()
 
-    # Get all of the professors from the website
-    professors = scrape_professors(supabase, testing=False)
+    # Get all of the professors from the website, unless a recent run already did
+    professors = load_cached_professors()
+    if professors is None:
+        professors = scrape_professors(supabase, testing=False)
+        save_professors_cache(professors)
+    else:
+        print(f"✔ Loaded {len(professors)} professors from {PROFESSOR_CACHE_PATH}")
 
     # Get the professors that need to be scraped
     professors_to_scrape = to_scrape_professor(supabase, professors)
@@ -550,16 +804,48 @@ if __name__ == "__main__":
 
     # Get all of the valid courses from the database
     valid_courses = get_all_valid_courses(supabase)
+    course_index = build_course_index(valid_courses)
 
-    # Iterate through the professors that need to be scraped
-    scraped_count = 0
+    # Get all of the previous reviews from the database in one pass, and attach them to the professors to be scraped
+    existing_reviews = get_existing_reviews(supabase)
     for prof in professors_to_scrape:
-        scrape_professor_comments(supabase, prof, valid_courses)
-        # Print what the current count is, and the remaining profs to be scraped
-        scraped_count += 1
-        print(f"Scraped {scraped_count}/{count_professors_to_scrape} professors")
-        # Sleep for a bit to avoid being blocked
-        time.sleep(1)
+        prof["existing_reviews"] = existing_reviews.get(prof["name"], [])
+
+    # Write to PostgREST over one persistent connection
+    postgrest_client = create_postgrest_client(supabase)
+
+    # Scrape the professors across a pool of worker processes, each reusing one Chrome driver,
+    # and buffer their rows so they are written to Supabase in batches
+    scraped_count = 0
+    profs_buffer = []
+    chunks_buffer = []
+    try:
+        with multiprocessing.Pool(processes=PROFESSOR_WORKERS, initializer=_init_worker, initargs=(course_index,)) as pool:
+            for result in pool.imap_unordered(_scrape_professor_worker, professors_to_scrape):
+                if result is not None:
+                    updated_prof, comment_data_batch = result
+                    profs_buffer.append(updated_prof)
+                    chunks_buffer.extend(comment_data_batch)
+
+                # Print what the current count is, and the remaining profs to be scraped
+                scraped_count += 1
+                print(f"Scraped {scraped_count}/{count_professors_to_scrape} professors")
+
+                if len(profs_buffer) >= PROFESSOR_FLUSH_SIZE:
+                    # Take the rows out of the buffers before writing them, so a failed write is never resent below
+                    profs_to_flush, chunks_to_flush = profs_buffer, chunks_buffer
+                    profs_buffer = []
+                    chunks_buffer = []
+                    flush_to_supabase(postgrest_client, profs_to_flush, chunks_to_flush)
+
+            # Let the workers exit normally so their drivers are quit
+            pool.close()
+            pool.join()
+    finally:
+        # Write the remaining professors and reviews, even if the run is interrupted
+        if profs_buffer or chunks_buffer:
+            flush_to_supabase(postgrest_client, profs_buffer, chunks_buffer)
+        postgrest_client.close()
 
     print("Scraping complete") 
     
\ No newline at end of file